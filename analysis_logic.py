@@ -1,29 +1,116 @@
 # Import the required libraries
 import re
-import json
+import html
+import gzip
+import zlib
+import contextlib
+import tempfile
+import time
+import asyncio
+import orjson
+import numpy as np
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
 from collections import Counter
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import vader_scoring
 import webbrowser
 import os
-
-# --- Pre-load NLTK data ---
-nltk.download('vader_lexicon', quiet=True)
+from string import Template
 
 
 # --- CONFIGURATION ---
 from youtubeapi import YOUTUBE_API_KEY
+YOUTUBE_COMMENT_THREADS_URL = "https://www.googleapis.com/youtube/v3/commentThreads"
 OLLAMA_API_URL = "http://localhost:11434/api/chat"
-OLLAMA_MODEL = "mistral" 
+# A small model is enough for the bullet-point summaries; the conclusion keeps mistral
+OLLAMA_SUMMARY_MODEL = "phi3:mini"
+OLLAMA_CONCLUSION_MODEL = "mistral"
+SENTIMENT_CATEGORIES = ('positive', 'negative', 'neutral')
+# Edges of the score distribution chart: -1/-0.6/-0.2/0.2/0.6/1
+SCORE_BIN_EDGES = np.array([-0.6, -0.2, 0.2, 0.6], dtype=np.float32)
+# The first large analysis starts the pool (~2 s for 4 workers). Warm, a sharded call costs ~5-10 ms
+# more than VADER's ~150 us per comment, so it pays off above ~130 comments on 2 cores
+VADER_PARALLEL_MIN_COMMENTS = 200
+VADER_WORKERS = os.cpu_count() or 1
+_TS_RE = re.compile(r'\b(\d{1,2}:\d{2}(?::\d{2})?)\b')
+_WORD_RE = re.compile(r'\b\w{4,}\b')
+# Approximate prompt tokens shared by the comments of all summarized categories
+SUMMARY_PROMPT_TOKEN_BUDGET = 2000
+# A handful of neutral comments rarely has themes worth an LLM round trip
+MIN_NEUTRAL_COMMENTS_TO_SUMMARIZE = 10
+KEYWORD_STOPWORDS = frozenset(['this', 'that', 'with', 'what', 'from', 'your', 'have', 'just', 'like', 'love', 'video'])
+# YouTube responses are cached on disk per video to spare quota on repeat analyses
+CACHE_DIR = "cache"
+CACHE_TTL_SECONDS = 24 * 60 * 60
+OLLAMA_HEADERS = {"Content-Type": "application/json", "Connection": "keep-alive", "Accept-Encoding": "gzip"}
+
+# --- Scoring pool: created on first use and kept for the life of the process ---
+_scoring_pool = None
+_scoring_pool_pid = None
+_scoring_pool_lock = threading.Lock()
+
+# --- Shared HTTP session: keeps the connection to Ollama alive between calls ---
+_ollama_session = requests.Session()
+_ollama_session.mount('http://', HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0))
+
+
+def _read_cache(name):
+    """
+    Returns the cached data stored under name, or None if it is missing, expired or unreadable.
+    """
+    path = os.path.join(CACHE_DIR, name)
+    try:
+        if time.time() - os.path.getmtime(path) > CACHE_TTL_SECONDS:
+            return None
+        with gzip.open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, EOFError, zlib.error, orjson.JSONDecodeError):
+        return None
+
+def _write_cache(name, data):
+    """
+    Stores data under name as gzip-compressed JSON, replacing any previous entry atomically.
+    A failed write is only logged: the cache is an optimization and must not fail the analysis.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            try:
+                raw = os.fdopen(fd, "wb")
+            except BaseException:
+                os.close(fd)
+                raise
+            with raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                    f.write(orjson.dumps(data))
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, os.path.join(CACHE_DIR, name))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f"Could not write cache entry {name}: {e}")
 
 
 def get_video_details(api_key, video_id):
     """
     Fetches details for a specific video like title and channel.
     """
+    cache_name = f"{video_id}_details.json.gz"
+    cached = _read_cache(cache_name)
+    if cached is not None:
+        return cached
     try:
         youtube = build("youtube", "v3", developerKey=api_key)
         request = youtube.videos().list(part="snippet", id=video_id)
@@ -31,143 +118,310 @@ def get_video_details(api_key, video_id):
         if not response['items']:
             return {"title": "Unknown Video", "channelTitle": "Unknown Channel"}
         snippet = response['items'][0]['snippet']
-        return {
+        details = {
             "title": snippet.get('title', 'No Title'),
             "channelTitle": snippet.get('channelTitle', 'No Channel Title')
         }
+        _write_cache(cache_name, details)
+        return details
     except HttpError as e:
         print(f"An HTTP error {e.resp.status} occurred while fetching video details: {e.content}")
         return {"title": "Unknown Video", "channelTitle": "Unknown Channel"}
 
 
+async def _fetch_comment_pages(session, params, queue):
+    """
+    Requests commentThreads pages back to back, queueing each page for parsing
+    as soon as it arrives and immediately asking for the next one.
+    """
+    try:
+        while True:
+            async with session.get(YOUTUBE_COMMENT_THREADS_URL, params=params) as response:
+                body = await response.read()
+                if response.status >= 400:
+                    # Keep YouTube's error body: it carries the reason (commentsDisabled, quotaExceeded, ...)
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status,
+                        message=body.decode("utf-8", errors="replace"), headers=response.headers
+                    )
+                page = orjson.loads(body)
+            next_page_token = page.get("nextPageToken")
+            await queue.put(page)
+            if not next_page_token:
+                break
+            params = {**params, "pageToken": next_page_token}
+    finally:
+        await queue.put(None)
+
+async def _fetch_all_comments(api_key, video_id):
+    """
+    Collects the top-level comment texts while the pages are still being fetched.
+    """
+    params = {"part": "snippet", "videoId": video_id, "textFormat": "plainText", "maxResults": 100, "key": api_key}
+    queue = asyncio.Queue()
+    comments = []
+    async with aiohttp.ClientSession() as session:
+        fetcher = asyncio.create_task(_fetch_comment_pages(session, params, queue))
+        while (page := await queue.get()) is not None:
+            for item in page["items"]:
+                comments.append(item["snippet"]["topLevelComment"]["snippet"]["textDisplay"])
+        await fetcher
+    return comments
+
 def get_video_comments(api_key, video_id):
     """
     Fetches all top-level comments from a YouTube video using the YouTube Data API.
     """
-    comments = []
+    cache_name = f"{video_id}_comments.json.gz"
+    cached = _read_cache(cache_name)
+    if cached is not None:
+        print(f"  > Using cached comments for {video_id}")
+        return cached
     try:
-        youtube = build("youtube", "v3", developerKey=api_key)
-        request = youtube.commentThreads().list(part="snippet", videoId=video_id, textFormat="plainText", maxResults=100)
-        while request:
-            response = request.execute()
-            for item in response["items"]:
-                comment = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                comments.append(comment)
-            request = youtube.commentThreads().list_next(request, response)
+        comments = asyncio.run(_fetch_all_comments(api_key, video_id))
+        _write_cache(cache_name, comments)
         return comments
-    except HttpError as e:
-        print(f"An HTTP error {e.resp.status} occurred: {e.content}")
-        if e.resp.status == 403:
+    except aiohttp.ClientResponseError as e:
+        print(f"An HTTP error {e.status} occurred: {e.message}")
+        if e.status == 403:
             print("This might be because comments are disabled for the video or your API key has an issue.")
         return None
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return None
 
+def setup():
+    """
+    One-time start-up work: fetches the VADER lexicon and loads the analyzer,
+    so no analysis request pays for them.
+    """
+    # Spawned scoring workers re-import the main script and run this again, so skip the network check once installed
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+    # The lexicon is immutable once loaded, so a single analyzer is shared by all analyses.
+    vader_scoring.load_analyzer()
+
+def _get_scoring_pool():
+    """
+    Returns the shared VADER worker pool. Workers are spawned rather than forked,
+    since forking the threaded web server can deadlock in the child. A pool inherited
+    through fork (e.g. gunicorn --preload) has lost its manager thread, so it is
+    dropped and a new one is started for this process.
+    """
+    global _scoring_pool, _scoring_pool_pid
+    with _scoring_pool_lock:
+        if _scoring_pool is None or _scoring_pool_pid != os.getpid():
+            _scoring_pool = ProcessPoolExecutor(
+                max_workers=VADER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=vader_scoring.load_analyzer
+            )
+            _scoring_pool_pid = os.getpid()
+        return _scoring_pool
+
+def _score_in_parallel(comments):
+    """
+    Scores the comments in one contiguous slice per worker, falling back to serial scoring if the pool died.
+    """
+    global _scoring_pool
+    chunk_size = -(-len(comments) // VADER_WORKERS)
+    chunks = [comments[i:i + chunk_size] for i in range(0, len(comments), chunk_size)]
+    pool = _get_scoring_pool()
+    try:
+        return np.concatenate(list(pool.map(vader_scoring.score_comments, chunks)))
+    except BrokenProcessPool as e:
+        print(f"VADER worker pool failed, scoring serially: {e}")
+        with _scoring_pool_lock:
+            if _scoring_pool is pool:
+                _scoring_pool = None
+        pool.shutdown(wait=False)
+        return vader_scoring.score_comments(comments)
+
 def analyze_comments_vader(comments):
     """
     Performs a fast, initial sentiment classification using VADER.
     """
-    analyzer = SentimentIntensityAnalyzer()
-    analysis_results = {'positive_comments': [], 'negative_comments': [], 'neutral_comments': []}
-    for comment in comments:
-        scores = analyzer.polarity_scores(comment)
-        compound_score = scores['compound']
-        sentiment_data = {'text': comment, 'score': compound_score}
-        if compound_score >= 0.05:
-            analysis_results['positive_comments'].append(sentiment_data)
-        elif compound_score <= -0.05:
-            analysis_results['negative_comments'].append(sentiment_data)
-        else:
-            analysis_results['neutral_comments'].append(sentiment_data)
+    if len(comments) >= VADER_PARALLEL_MIN_COMMENTS and VADER_WORKERS > 1:
+        scores = _score_in_parallel(comments)
+    else:
+        scores = vader_scoring.score_comments(comments)
+    analysis_results = {
+        'texts': comments,
+        'scores': scores,
+        'labels': np.digitize(scores, SCORE_BIN_EDGES),
+        'positive': np.flatnonzero(scores >= 0.05),
+        'negative': np.flatnonzero(scores <= -0.05),
+        'neutral': np.flatnonzero((scores > -0.05) & (scores < 0.05))
+    }
     return analysis_results
 
-def summarize_with_ollama(comments, category):
+def _top_indices(scores, indices, k, reverse=True):
+    """
+    Returns the k indices with the highest (or lowest) scores, sorted by score.
+    """
+    values = -scores[indices] if reverse else scores[indices]
+    return indices[np.argsort(values, kind='stable')[:k]]
+
+def _estimate_tokens(text):
+    """
+    Rough token count for prompt budgeting (~4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+def _pack_comments(texts, scores, indices, token_budget):
+    """
+    Greedily packs the most sentiment-laden comments into prompt lines until the token budget is spent.
+    """
+    lines = []
+    for i in indices[np.argsort(-np.abs(scores[indices]), kind='stable')]:
+        line = f"- \"{texts[i]}\""
+        cost = _estimate_tokens(line)
+        if cost > token_budget:
+            if lines:
+                continue
+            line, cost = line[:token_budget * 4], token_budget
+        lines.append(line)
+        token_budget -= cost
+        if token_budget <= 0:
+            break
+    return lines
+
+def summarize_all_with_ollama(results):
     """
-    Uses a local Ollama model to summarize the key themes in a list of comments.
+    Uses a local Ollama model to summarize the key themes of the positive, negative
+    and neutral comments in a single request. Returns the HTML of each category plus
+    the raw theme lists under 'themes'.
     """
-    if not comments:
-        return f"<p>No {category} comments to analyze.</p>"
-    comment_texts = "\n".join([f"- \"{c['text']}\"" for c in comments[:30]])
+    summaries = {'themes': {}}
+    for category in SENTIMENT_CATEGORIES:
+        indices = results[category]
+        if not len(indices):
+            summaries[category] = f"<p>No {category} comments to analyze.</p>"
+        elif category == 'neutral' and len(indices) < MIN_NEUTRAL_COMMENTS_TO_SUMMARIZE:
+            summaries[category] = f"<p>Only {len(indices)} neutral comments — no themes to summarize.</p>"
+    requested = [c for c in SENTIMENT_CATEGORIES if c not in summaries]
+    if not requested:
+        return summaries
+    token_budget = SUMMARY_PROMPT_TOKEN_BUDGET // len(requested)
+    sections = []
+    for category in requested:
+        comment_lines = _pack_comments(results['texts'], results['scores'], results[category], token_budget)
+        sections.append(f"'{category}' comments:\n" + "\n".join(comment_lines))
     prompt = (
-        f"You are a TECHNO DJ analyst. Based ONLY on the following '{category}' comments, "
-        "summarize the key themes in 2-3 concise bullet points. Format the output as simple HTML bullet points using <ul> and <li> tags.\n\n"
-        f"Comments:\n{comment_texts}"
+        "You are a TECHNO DJ analyst. Based ONLY on the comments below, grouped by sentiment, "
+        "summarize the key themes of each group in 2-3 concise bullet points. "
+        f"Return JSON with the keys {', '.join(requested)}, each an array of 2-3 short theme strings.\n\n"
+        + "\n\n".join(sections)
     )
-    payload = { "model": OLLAMA_MODEL, "messages": [{"role": "user", "content": prompt}], "stream": False }
-    headers = {"Content-Type": "application/json"}
+    payload = { "model": OLLAMA_SUMMARY_MODEL, "messages": [{"role": "user", "content": prompt}], "format": "json", "stream": False }
     try:
-        print(f"  > Sending {category} comments to local Ollama model for summarization...")
-        response = requests.post(OLLAMA_API_URL, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        result = response.json()
-        return result['message']['content']
+        print(f"  > Sending {', '.join(requested)} comments to local Ollama model for summarization...")
+        parsed = _parse_json_object(_ollama_chat(payload))
     except Exception as e:
-        return f"<p class='text-red-400'>Error communicating with Ollama: {e}</p>"
+        error = f"<p class='text-red-400'>Error communicating with Ollama: {e}</p>"
+        summaries.update({category: error for category in requested})
+        return summaries
+    for category in requested:
+        themes = _as_string_list(parsed.get(category))
+        if themes:
+            summaries['themes'][category] = themes
+            summaries[category] = _render_list_html(themes)
+        else:
+            summaries[category] = f"<p class='text-red-400'>Ollama returned no {category} summary.</p>"
+    return summaries
+
+def _parse_json_object(content):
+    """
+    Parses a model reply that must be a JSON object; JSON mode only guarantees valid JSON.
+    """
+    parsed = orjson.loads(content)
+    if not isinstance(parsed, dict):
+        raise ValueError(f"expected a JSON object, got {type(parsed).__name__}")
+    return parsed
+
+def _as_string_list(value):
+    """
+    Normalizes a JSON value from the model into a list of non-empty strings.
+    """
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def _render_list_html(items):
+    """
+    Renders plain-text items as an HTML bullet list.
+    """
+    return "<ul>" + "".join(f"<li>{html.escape(item)}</li>" for item in items) + "</ul>"
+
+def _format_themes(themes):
+    """
+    Formats a theme list as plain-text bullets for the conclusion prompt.
+    """
+    return "\n".join(f"- {theme}" for theme in themes) if themes else "None"
+
+def _ollama_chat(payload):
+    """
+    Sends a chat completion request to Ollama and returns the message content.
+    """
+    response = _ollama_session.post(OLLAMA_API_URL, headers=OLLAMA_HEADERS, data=orjson.dumps(payload))
+    response.raise_for_status()
+    result = orjson.loads(response.content)
+    return result['message']['content']
 
 def generate_strategic_conclusion(total_comments, results, summaries):
     """
     Uses Ollama to generate strategic advice based on the full analysis.
     """
     print("  > Sending full report to local Ollama model for strategic conclusion...")
-    num_positive = len(results['positive_comments'])
-    num_negative = len(results['negative_comments'])
-    clean_positive_summary = re.sub('<[^<]+?>', '', summaries['positive'])
-    clean_negative_summary = re.sub('<[^<]+?>', '', summaries['negative'])
+    num_positive = len(results['positive'])
+    num_negative = len(results['negative'])
+    themes = summaries.get('themes', {})
     prompt = (
         "You are a Techno DJ strategy consultant. I will provide you with a sentiment analysis report for a video. "
         "Your task is to provide 3-4 actionable, strategic suggestions for the mathame dj duo. "
         "Focus on what's working (strengths to double down on), what isn't (weaknesses to address), and how they can improve audience engagement or content strategy. "
-        "Format the output as an HTML unordered list (`<ul>` and `<li>` tags).\n\n"
+        "Return JSON with the key suggestions, an array of suggestion strings.\n\n"
         f"--- ANALYSIS REPORT ---\n"
         f"Total Comments: {total_comments}\n"
         f"Positive Comments: {num_positive} ({num_positive/total_comments:.1%})\n"
         f"Negative Comments: {num_negative} ({num_negative/total_comments:.1%})\n\n"
-        f"Key Positive Themes:\n{clean_positive_summary}\n\n"
-        f"Key Negative Themes:\n{clean_negative_summary}\n"
-        "--- END REPORT ---\n\n"
-        "Strategic Suggestions:"
+        f"Key Positive Themes:\n{_format_themes(themes.get('positive'))}\n\n"
+        f"Key Negative Themes:\n{_format_themes(themes.get('negative'))}\n"
+        "--- END REPORT ---"
     )
-    payload = { "model": OLLAMA_MODEL, "messages": [{"role": "user", "content": prompt}], "stream": False }
-    headers = {"Content-Type": "application/json"}
+    payload = { "model": OLLAMA_CONCLUSION_MODEL, "messages": [{"role": "user", "content": prompt}], "format": "json", "stream": False }
     try:
-        response = requests.post(OLLAMA_API_URL, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        result = response.json()
-        return result['message']['content']
+        suggestions = _as_string_list(_parse_json_object(_ollama_chat(payload)).get('suggestions'))
+        if not suggestions:
+            return "<p class='text-red-400'>Ollama returned no strategic suggestions.</p>"
+        return _render_list_html(suggestions)
     except Exception as e:
         return f"<p class='text-red-400'>Failed to generate strategic conclusion: {e}</p>"
 
-def extract_insights(positive_comments):
+def extract_insights(results):
     """
     Extracts timestamps and common keywords from positive comments.
     """
-    timestamp_regex = re.compile(r'\b(\d{1,2}:\d{2}(?::\d{2})?)\b')
-    all_timestamp_mentions = [] 
-    all_positive_text = ""
-    for comment_data in positive_comments:
-        text = comment_data['text']
-        all_positive_text += text + " "
-        found_stamps = timestamp_regex.findall(text)
-        for ts in found_stamps:
-            all_timestamp_mentions.append({'timestamp': ts, 'comment': text})
-    unique_timestamps_map = {}
-    for mention in all_timestamp_mentions:
-        ts = mention['timestamp']
-        if ts not in unique_timestamps_map:
-            unique_timestamps_map[ts] = {'comment': mention['comment'], 'count': 0}
-        unique_timestamps_map[ts]['count'] += 1
-    top_timestamps_with_comments = []
-    for ts, data in unique_timestamps_map.items():
-        top_timestamps_with_comments.append({'timestamp': ts, 'comment': data['comment'], 'count': data['count']})
-    top_timestamps_with_comments.sort(key=lambda x: x['count'], reverse=True)
-    top_timestamps_with_comments = top_timestamps_with_comments[:5]
-    words = re.findall(r'\b\w{4,}\b', all_positive_text.lower())
-    stopwords = set(['this', 'that', 'with', 'what', 'from', 'your', 'have', 'just', 'like', 'love', 'video'])
-    meaningful_words = [word for word in words if word not in stopwords]
+    texts = [results['texts'][i] for i in results['positive']]
+    all_positive_text = " ".join(texts).lower()
+    timestamp_counts = Counter()
+    timestamp_examples = {}
+    for text in texts:
+        for ts in _TS_RE.findall(text):
+            timestamp_counts[ts] += 1
+            timestamp_examples.setdefault(ts, text)
+    top_timestamps_with_comments = [
+        {'timestamp': ts, 'comment': timestamp_examples[ts], 'count': count}
+        for ts, count in timestamp_counts.most_common(5)
+    ]
+    keywords = Counter(word for word in _WORD_RE.findall(all_positive_text) if word not in KEYWORD_STOPWORDS)
     return {
         'top_timestamps_with_comments': top_timestamps_with_comments,
-        'top_keywords': Counter(meaningful_words).most_common(10)
+        'top_keywords': keywords.most_common(10)
     }
 
 def update_landing_page(video_id, video_title):
@@ -177,72 +431,21 @@ def update_landing_page(video_id, video_title):
     json_db_file = "reports_data.json"
     reports = {}
     if os.path.exists(json_db_file):
-        with open(json_db_file, "r", encoding="utf-8") as f:
-            try: reports = json.load(f)
-            except json.JSONDecodeError: reports = {}
+        with open(json_db_file, "rb") as f:
+            try: reports = orjson.loads(f.read())
+            except orjson.JSONDecodeError: reports = {}
     
     # Only add the new report if a video_id is provided
     if video_id and video_title:
         reports[video_id] = video_title
     
-    with open(json_db_file, "w", encoding="utf-8") as f:
-        json.dump(reports, f, indent=4)
+    with open(json_db_file, "wb") as f:
+        f.write(orjson.dumps(reports, option=orjson.OPT_INDENT_2))
     print(f"✅ Reports database updated: {json_db_file}")
 
-def generate_html_report(video_id, video_details, total_comments, results, insights, summaries, strategic_conclusion):
-    """
-    Generates a visually stunning HTML report from the analysis data.
-    """
-    report_file_name = f"{video_id}_report.html"
-    num_positive = len(results['positive_comments'])
-    num_negative = len(results['negative_comments'])
-    num_neutral = len(results['neutral_comments'])
-    top_3_positive = sorted(results['positive_comments'], key=lambda x: x['score'], reverse=True)[:3]
-    top_3_negative = sorted(results['negative_comments'], key=lambda x: x['score'])[:3]
-    positive_scores = [c['score'] for c in results['positive_comments']]
-    negative_scores = [c['score'] for c in results['negative_comments']]
-    score_bins = {'-1.0 to -0.6': 0, '-0.6 to -0.2': 0, 'Neutral (-0.2 to 0.2)': num_neutral, '0.2 to 0.6': 0, '0.6 to 1.0': 0}
-    for score in negative_scores:
-        if -1.0 <= score < -0.6: score_bins['-1.0 to -0.6'] += 1
-        elif -0.6 <= score < -0.2: score_bins['-0.6 to -0.2'] += 1
-    for score in positive_scores:
-        if 0.2 <= score < 0.6: score_bins['0.2 to 0.6'] += 1
-        elif 0.6 <= score <= 1.0: score_bins['0.6 to 1.0'] += 1
-    chart_labels = list(score_bins.keys())
-    chart_data = list(score_bins.values())
-    def create_reaction_html(comments, positive=True):
-        if not comments: return f"<li>Nessuna reazione {'positiva' if positive else 'negativa'} significativa trovata.</li>"
-        return "".join([f"""<li class="mb-2"><span class="font-semibold text-white">(Punteggio: {c['score']:.2f})</span> "{c['text'][:100]}{'...' if len(c['text']) > 100 else ''}"</li>""" for c in comments])
-    def create_insights_list_html(items, not_found_text):
-        if not items: return f"<li>{not_found_text}</li>"
-        return "".join([f"""<li class="mb-2"><span class="font-bold text-teal-400">{item['timestamp']}</span> (menzionato {item['count']} volte)</li>""" for item in items])
-    def create_keywords_html(keywords):
-        if not keywords: return "<p>Nessuna parola chiave prominente trovata.</p>"
-        max_count = keywords[0][1] if keywords else 1
-        tags = []
-        for keyword, count in keywords:
-            size_class = 'text-lg'
-            if count > max_count * 0.7: size_class = 'text-2xl'
-            elif count > max_count * 0.4: size_class = 'text-xl'
-            tags.append(f'<span class="inline-block bg-gray-700 text-teal-300 rounded-full px-3 py-1 m-1 font-semibold {size_class}">{keyword}</span>')
-        return "".join(tags)
-    moment_players_html = []
-    for i, moment in enumerate(insights['top_timestamps_with_comments']):
-        parts = moment['timestamp'].split(':')
-        start_seconds = 0
-        if len(parts) == 2: start_seconds = int(parts[0]) * 60 + int(parts[1])
-        elif len(parts) == 3: start_seconds = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
-        moment_players_html.append(f"""
-        <div class="card p-4 rounded-lg">
-            <div class="w-full aspect-w-16 aspect-h-9 mx-auto mb-3">
-                <iframe src="https://www.youtube.com/embed/{video_id}?start={start_seconds}&controls=1&rel=0&modestbranding=1" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share" referrerpolicy="strict-origin-when-cross-origin" allowfullscreen></iframe>
-            </div>
-            <p class="text-gray-400 text-sm italic text-center">"{moment['comment'][:150]}..." <span class="text-teal-400 font-semibold">({moment['timestamp']})</span></p>
-        </div>
-        """)
-    moment_players_html_str = "\n".join(moment_players_html)
-    html_template = f"""
-    <!DOCTYPE html>
+# --- HTML report skeleton, parsed once and rendered section by section ---
+_REPORT_TEMPLATE_SECTIONS = tuple(Template(section) for section in (
+    """    <!DOCTYPE html>
     <html lang="it">
     <head>
         <meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
@@ -250,24 +453,26 @@ def generate_html_report(video_id, video_details, total_comments, results, insig
         <script src="https://cdn.tailwindcss.com"></script><script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
         <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
         <style>
-            body {{ font-family: 'Inter', sans-serif; background-color: #000000; color: #d1d5db; }}
-            .hero-gradient {{ background-color: #1f2937; }} .card {{ background-color: #1f2937; border: 1px solid #374151; }}
-            .section-title {{ border-bottom: 2px solid #14b8a6; padding-bottom: 8px; }} .chart-container {{ height: 400px; width: 100%; }}
-            .aspect-w-16 {{ position: relative; width: 100%; }} .aspect-h-9 {{ padding-bottom: 56.25%; }}
-            .aspect-w-16 iframe, .aspect-w-16 > div {{ position: absolute; width: 100%; height: 100%; top: 0; left: 0; }}
+            body { font-family: 'Inter', sans-serif; background-color: #000000; color: #d1d5db; }
+            .hero-gradient { background-color: #1f2937; } .card { background-color: #1f2937; border: 1px solid #374151; }
+            .section-title { border-bottom: 2px solid #14b8a6; padding-bottom: 8px; } .chart-container { height: 400px; width: 100%; }
+            .aspect-w-16 { position: relative; width: 100%; } .aspect-h-9 { padding-bottom: 56.25%; }
+            .aspect-w-16 iframe, .aspect-w-16 > div { position: absolute; width: 100%; height: 100%; top: 0; left: 0; }
         </style>
     </head>
     <body class="antialiased">
         <header class="bg-black/80 backdrop-blur-md shadow-lg sticky top-0 z-50"><div class="container mx-auto px-6 py-3"><h1 class="text-xl font-bold text-white">Report di Analisi del Sentiment di YouTube</h1></div></header>
-        <main>
+""",
+    """        <main>
             <section class="text-center py-20 px-6 hero-gradient">
-                <p class="text-teal-400 font-semibold">{video_details['channelTitle']}</p>
-                <h2 class="text-4xl md:text-5xl font-extrabold text-white mb-4 tracking-tight">{video_details['title']}</h2>
-                <div class="max-w-4xl mx-auto my-8"><div class="w-full aspect-w-16 aspect-h-9"><iframe src="https://www.youtube.com/embed/{video_id}" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share" referrerpolicy="strict-origin-when-cross-origin" allowfullscreen class="rounded-lg shadow-2xl"></iframe></div></div>
-                <p class="text-lg text-gray-400 max-w-3xl mx-auto">Un'analisi del sentiment basata sull'IA di {total_comments} commenti di YouTube.</p>
+                <p class="text-teal-400 font-semibold">$channel_title</p>
+                <h2 class="text-4xl md:text-5xl font-extrabold text-white mb-4 tracking-tight">$video_title</h2>
+                <div class="max-w-4xl mx-auto my-8"><div class="w-full aspect-w-16 aspect-h-9"><iframe src="https://www.youtube.com/embed/$video_id" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share" referrerpolicy="strict-origin-when-cross-origin" allowfullscreen class="rounded-lg shadow-2xl"></iframe></div></div>
+                <p class="text-lg text-gray-400 max-w-3xl mx-auto">Un'analisi del sentiment basata sull'IA di $total_comments commenti di YouTube.</p>
             </section>
             <div class="container mx-auto px-6 py-16">
-                <section id="statistics" class="mb-16">
+""",
+    """                <section id="statistics" class="mb-16">
                     <h3 class="text-4xl font-bold text-center mb-10 section-title text-white">Statistiche Visive</h3>
                     <div class="grid md:grid-cols-5 gap-8">
                         <div class="md:col-span-2 card p-6 rounded-lg"><h4 class="text-xl font-bold text-center text-teal-400 mb-4">Ripartizione del Sentiment</h4><div class="chart-container mx-auto" style="height: 350px;"><canvas id="sentimentDoughnutChart"></canvas></div></div>
@@ -277,43 +482,113 @@ def generate_html_report(video_id, video_details, total_comments, results, insig
                 <section id="summaries" class="mb-16">
                     <h3 class="text-4xl font-bold text-center mb-10 section-title text-white">Riepiloghi Tematici Generati dall'IA</h3>
                     <div class="grid md:grid-cols-3 gap-8">
-                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-green-400 mb-4">Temi Positivi</h4><div class="text-gray-300 space-y-2">{summaries['positive']}</div></div>
-                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-red-400 mb-4">Temi Negativi</h4><div class="text-gray-300 space-y-2">{summaries['negative']}</div></div>
-                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-gray-400 mb-4">Temi Neutrali</h4><div class="text-gray-300 space-y-2">{summaries['neutral']}</div></div>
+                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-green-400 mb-4">Temi Positivi</h4><div class="text-gray-300 space-y-2">$positive_summary</div></div>
+                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-red-400 mb-4">Temi Negativi</h4><div class="text-gray-300 space-y-2">$negative_summary</div></div>
+                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-gray-400 mb-4">Temi Neutrali</h4><div class="text-gray-300 space-y-2">$neutral_summary</div></div>
                     </div>
                 </section>
-                <section id="insights" class="mb-16">
+""",
+    """                <section id="insights" class="mb-16">
                      <h3 class="text-4xl font-bold text-center mb-10 section-title text-white">Approfondimenti</h3>
                      <div class="grid md:grid-cols-2 lg:grid-cols-3 gap-8">
-                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-teal-400 mb-3">❤️ Le 3 Migliori Reazioni Positive</h4><ul class="text-gray-400 space-y-2">{create_reaction_html(top_3_positive, positive=True)}</ul></div>
-                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-teal-400 mb-3">💔 Le 3 Migliori Reazioni Negative</h4><ul class="text-gray-400 space-y-2">{create_reaction_html(top_3_negative, positive=False)}</ul></div>
-                        <div class="card p-6 rounded-lg lg:col-span-1"><h4 class="text-xl font-bold text-teal-400 mb-3">⏱️ Momenti Migliori (Timestamp)</h4><ul class="text-gray-400 space-y-2">{create_insights_list_html(insights['top_timestamps_with_comments'], 'Nessun timestamp trovato.')}</ul></div>
+                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-teal-400 mb-3">❤️ Le 3 Migliori Reazioni Positive</h4><ul class="text-gray-400 space-y-2">$top_positive_html</ul></div>
+                        <div class="card p-6 rounded-lg"><h4 class="text-xl font-bold text-teal-400 mb-3">💔 Le 3 Migliori Reazioni Negative</h4><ul class="text-gray-400 space-y-2">$top_negative_html</ul></div>
+                        <div class="card p-6 rounded-lg lg:col-span-1"><h4 class="text-xl font-bold text-teal-400 mb-3">⏱️ Momenti Migliori (Timestamp)</h4><ul class="text-gray-400 space-y-2">$timestamps_html</ul></div>
                      </div>
-                     <div class="card p-8 rounded-lg mt-8"><h4 class="text-xl font-bold text-teal-400 mb-4 text-center">Argomenti Caldi nei Commenti Positivi</h4><div class="text-center">{create_keywords_html(insights['top_keywords'])}</div></div>
+                     <div class="card p-8 rounded-lg mt-8"><h4 class="text-xl font-bold text-teal-400 mb-4 text-center">Argomenti Caldi nei Commenti Positivi</h4><div class="text-center">$keywords_html</div></div>
                 </section>
-                <section id="comment-moments" class="mb-16">
+""",
+    """                <section id="comment-moments" class="mb-16">
                     <h3 class="text-4xl font-bold text-center mb-10 section-title text-white">Momenti Chiave Riferiti nei Commenti</h3>
-                    <div id="moments-container" class="grid md:grid-cols-2 gap-8">{moment_players_html_str}</div>
+                    <div id="moments-container" class="grid md:grid-cols-2 gap-8">$moments_html</div>
                 </section>
-                <section id="conclusion">
+""",
+    """                <section id="conclusion">
                      <h3 class="text-4xl font-bold text-center mb-10 section-title text-white">Conclusioni Strategiche e Suggerimenti</h3>
-                     <div class="max-w-4xl mx-auto card p-8 rounded-lg"><div class="text-gray-300 space-y-3">{strategic_conclusion}</div></div>
+                     <div class="max-w-4xl mx-auto card p-8 rounded-lg"><div class="text-gray-300 space-y-3">$strategic_conclusion</div></div>
                 </section>
             </div>
         </main>
         <footer class="bg-gray-900 text-white mt-16"><div class="container mx-auto px-6 py-8 text-center"><p class="text-gray-500">&copy; 2025 Analisi del Sentiment IA. Report generato localmente.</p></div></footer>
-        <script>
+""",
+    """        <script>
             const doughnutCtx = document.getElementById('sentimentDoughnutChart').getContext('2d');
             const barCtx = document.getElementById('scoreDistributionBarChart').getContext('2d');
             Chart.defaults.color = '#d1d5db'; Chart.defaults.font.family = "'Inter', sans-serif";
-            new Chart(doughnutCtx, {{ type: 'doughnut', data: {{ labels: ['Positivo', 'Negativo', 'Neutrale'], datasets: [{{ label: 'Ripartizione del Sentiment', data: [{num_positive}, {num_negative}, {num_neutral}], backgroundColor: ['#2dd4bf', '#f87171', '#9ca3af'], borderColor: '#1f2937', borderWidth: 4, hoverOffset: 8 }}] }}, options: {{ responsive: true, maintainAspectRatio: false, plugins: {{ legend: {{ position: 'bottom', labels: {{ padding: 20, font: {{ size: 14 }} }} }} }} }} }});
-            new Chart(barCtx, {{ type: 'bar', data: {{ labels: {json.dumps(chart_labels)}, datasets: [{{ label: 'Numero di Commenti', data: {json.dumps(chart_data)}, backgroundColor: [ 'rgba(248, 113, 113, 0.6)', 'rgba(251, 146, 60, 0.6)', 'rgba(156, 163, 175, 0.6)', 'rgba(52, 211, 153, 0.6)', 'rgba(45, 212, 191, 0.6)', ], borderColor: [ '#f87171', '#fb923c', '#9ca3af', '#34d399', '#2dd4bf' ], borderWidth: 2 }}] }}, options: {{ responsive: true, maintainAspectRatio: false, scales: {{ y: {{ beginAtZero: true, grid: {{ color: '#374151' }}, ticks: {{ precision: 0 }} }}, x: {{ grid: {{ display: false }} }} }}, plugins: {{ legend: {{ display: false }} }} }} }});
+            new Chart(doughnutCtx, { type: 'doughnut', data: { labels: ['Positivo', 'Negativo', 'Neutrale'], datasets: [{ label: 'Ripartizione del Sentiment', data: [$num_positive, $num_negative, $num_neutral], backgroundColor: ['#2dd4bf', '#f87171', '#9ca3af'], borderColor: '#1f2937', borderWidth: 4, hoverOffset: 8 }] }, options: { responsive: true, maintainAspectRatio: false, plugins: { legend: { position: 'bottom', labels: { padding: 20, font: { size: 14 } } } } } });
+            new Chart(barCtx, { type: 'bar', data: { labels: $chart_labels, datasets: [{ label: 'Numero di Commenti', data: $chart_data, backgroundColor: [ 'rgba(248, 113, 113, 0.6)', 'rgba(251, 146, 60, 0.6)', 'rgba(156, 163, 175, 0.6)', 'rgba(52, 211, 153, 0.6)', 'rgba(45, 212, 191, 0.6)', ], borderColor: [ '#f87171', '#fb923c', '#9ca3af', '#34d399', '#2dd4bf' ], borderWidth: 2 }] }, options: { responsive: true, maintainAspectRatio: false, scales: { y: { beginAtZero: true, grid: { color: '#374151' }, ticks: { precision: 0 } }, x: { grid: { display: false } } }, plugins: { legend: { display: false } } } });
         </script>
     </body>
     </html>
+"""
+))
+
+def generate_html_report(video_id, video_details, total_comments, results, insights, summaries, strategic_conclusion):
     """
+    Generates a visually stunning HTML report from the analysis data.
+    """
+    report_file_name = f"{video_id}_report.html"
+    texts, scores = results['texts'], results['scores']
+    num_positive = len(results['positive'])
+    num_negative = len(results['negative'])
+    num_neutral = len(results['neutral'])
+    top_3_positive = _top_indices(scores, results['positive'], 3, reverse=True)
+    top_3_negative = _top_indices(scores, results['negative'], 3, reverse=False)
+    chart_labels = ['-1.0 to -0.6', '-0.6 to -0.2', 'Neutral (-0.2 to 0.2)', '0.2 to 0.6', '0.6 to 1.0']
+    chart_data = np.bincount(results['labels'], minlength=len(chart_labels)).tolist()
+    def create_reaction_html(indices, positive=True):
+        if not len(indices): return f"<li>Nessuna reazione {'positiva' if positive else 'negativa'} significativa trovata.</li>"
+        return "".join([f"""<li class="mb-2"><span class="font-semibold text-white">(Punteggio: {scores[i]:.2f})</span> "{texts[i][:100]}{'...' if len(texts[i]) > 100 else ''}"</li>""" for i in indices])
+    def create_insights_list_html(items, not_found_text):
+        if not items: return f"<li>{not_found_text}</li>"
+        return "".join([f"""<li class="mb-2"><span class="font-bold text-teal-400">{item['timestamp']}</span> (menzionato {item['count']} volte)</li>""" for item in items])
+    def create_keywords_html(keywords):
+        if not keywords: return "<p>Nessuna parola chiave prominente trovata.</p>"
+        max_count = keywords[0][1] if keywords else 1
+        tags = []
+        for keyword, count in keywords:
+            size_class = 'text-lg'
+            if count > max_count * 0.7: size_class = 'text-2xl'
+            elif count > max_count * 0.4: size_class = 'text-xl'
+            tags.append(f'<span class="inline-block bg-gray-700 text-teal-300 rounded-full px-3 py-1 m-1 font-semibold {size_class}">{keyword}</span>')
+        return "".join(tags)
+    moment_players_html = []
+    for i, moment in enumerate(insights['top_timestamps_with_comments']):
+        parts = moment['timestamp'].split(':')
+        start_seconds = 0
+        if len(parts) == 2: start_seconds = int(parts[0]) * 60 + int(parts[1])
+        elif len(parts) == 3: start_seconds = int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+        moment_players_html.append(f"""
+        <div class="card p-4 rounded-lg">
+            <div class="w-full aspect-w-16 aspect-h-9 mx-auto mb-3">
+                <iframe src="https://www.youtube.com/embed/{video_id}?start={start_seconds}&controls=1&rel=0&modestbranding=1" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share" referrerpolicy="strict-origin-when-cross-origin" allowfullscreen></iframe>
+            </div>
+            <p class="text-gray-400 text-sm italic text-center">"{moment['comment'][:150]}..." <span class="text-teal-400 font-semibold">({moment['timestamp']})</span></p>
+        </div>
+        """)
+    moment_players_html_str = "\n".join(moment_players_html)
+    context = {
+        'video_id': video_id,
+        'channel_title': video_details['channelTitle'],
+        'video_title': video_details['title'],
+        'total_comments': total_comments,
+        'positive_summary': summaries['positive'],
+        'negative_summary': summaries['negative'],
+        'neutral_summary': summaries['neutral'],
+        'top_positive_html': create_reaction_html(top_3_positive, positive=True),
+        'top_negative_html': create_reaction_html(top_3_negative, positive=False),
+        'timestamps_html': create_insights_list_html(insights['top_timestamps_with_comments'], 'Nessun timestamp trovato.'),
+        'keywords_html': create_keywords_html(insights['top_keywords']),
+        'moments_html': moment_players_html_str,
+        'strategic_conclusion': strategic_conclusion,
+        'num_positive': num_positive,
+        'num_negative': num_negative,
+        'num_neutral': num_neutral,
+        'chart_labels': orjson.dumps(chart_labels).decode(),
+        'chart_data': orjson.dumps(chart_data).decode()
+    }
     with open(report_file_name, "w", encoding='utf-8') as f:
-        f.write(html_template)
+        f.writelines(section.substitute(context) for section in _REPORT_TEMPLATE_SECTIONS)
     print(f"\n✅ HTML report generated: {report_file_name}")
     return report_file_name
 
@@ -2,10 +2,14 @@ from flask import Flask, render_template, request, jsonify, send_from_directory
 import analysis_logic
 import re
 import os
-import json
+import orjson
 
 app = Flask(__name__)
 
+analysis_logic.setup()
+
+VIDEO_ID_RE = re.compile(r'(?:v=|\/|embed\/|youtu.be\/)([0-9A-Za-z_-]{11})')
+
 # --- Route 1: La Pagina Principale (ora dinamica) ---
 @app.route('/')
 def index():
@@ -15,10 +19,10 @@ def index():
     json_db_file = "reports_data.json"
     reports = {}
     if os.path.exists(json_db_file):
-        with open(json_db_file, "r", encoding="utf-8") as f:
+        with open(json_db_file, "rb") as f:
             try:
-                reports = json.load(f)
-            except json.JSONDecodeError:
+                reports = orjson.loads(f.read())
+            except orjson.JSONDecodeError:
                 reports = {}
     
     # Passa i dati dei report al template HTML
@@ -44,7 +48,7 @@ def analyze_video():
     if not youtube_url:
         return jsonify({'error': 'URL è richiesto'}), 400
 
-    video_id_match = re.search(r'(?:v=|\/|embed\/|youtu.be\/)([0-9A-Za-z_-]{11})', youtube_url)
+    video_id_match = VIDEO_ID_RE.search(youtube_url)
     if not video_id_match:
         return jsonify({'error': 'URL di YouTube non valido'}), 400
     
@@ -65,13 +69,9 @@ def analyze_video():
 
         analysis_data = analysis_logic.analyze_comments_vader(video_comments)
         
-        summaries = {
-            'positive': analysis_logic.summarize_with_ollama(analysis_data['positive_comments'], 'positive'),
-            'negative': analysis_logic.summarize_with_ollama(analysis_data['negative_comments'], 'negative'),
-            'neutral': analysis_logic.summarize_with_ollama(analysis_data['neutral_comments'], 'neutral')
-        }
+        summaries = analysis_logic.summarize_all_with_ollama(analysis_data)
         
-        insight_data = analysis_logic.extract_insights(analysis_data['positive_comments'])
+        insight_data = analysis_logic.extract_insights(analysis_data)
 
         strategic_conclusion = analysis_logic.generate_strategic_conclusion(
             len(video_comments), analysis_data, summaries
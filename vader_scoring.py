@@ -0,0 +1,24 @@
+# VADER scoring helpers, kept free of import side effects so the scoring workers
+# can import them cheaply; one-time setup lives in analysis_logic.setup().
+import numpy as np
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+_analyzer = None
+
+
+def load_analyzer():
+    """
+    Loads the VADER lexicon once per process; also used as the worker pool initializer.
+    """
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def score_comments(comments):
+    """
+    Returns the VADER compound scores of a list of comments as a float32 array.
+    """
+    analyzer = load_analyzer()
+    return np.fromiter((analyzer.polarity_scores(c)['compound'] for c in comments), dtype=np.float32, count=len(comments))